@@ -1,11 +1,75 @@
 import logging
-from typing import Dict, Any
-from http import HTTPStatus
+from typing import Callable, Dict, Any, List
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# HTTP status codes for the error responses (plain ints, no http import needed).
+_HTTP_BAD_REQUEST = 400
+_HTTP_ISE = 500
+
+
+# Response body for 'process_return', built once and shared across invocations.
+# It is only serialized by the Lambda runtime, never mutated, so reusing the
+# same dict is safe (a MappingProxyType would not be JSON-serializable).
+_PROCESS_RETURN_BODY: Dict[str, Any] = {
+   'TEXT': {
+       "body": "Process return function was called successfully with parameters:"
+   }
+}
+
+
+def process_return(order_number: str) -> None:
+   """
+   Processes the return of an order.
+  
+   Args:
+       order_number (str): The identifier of the order being returned
+   """
+   logger.info('Return processed for order %s', order_number)
+
+
+def _handle_process_return(function: str, parameters: List[Dict[str, Any]]) -> Dict[str, Any]:
+   """
+   Handles the 'process_return' function.
+  
+   Args:
+       function (str): The function name from the event
+       parameters (List[Dict[str, Any]]): The function parameters from the event
+  
+   Returns:
+       Dict[str, Any]: The response body for the action
+   """
+   #extract the OrderNumber from the parameters
+   orderNumber = 'abc123'
+   process_return(orderNumber)
+   return _PROCESS_RETURN_BODY
+
+
+def _default_handler(function: str, parameters: List[Dict[str, Any]]) -> Dict[str, Any]:
+   """
+   Handles any function without a dedicated handler.
+  
+   Args:
+       function (str): The function name from the event
+       parameters (List[Dict[str, Any]]): The function parameters from the event
+  
+   Returns:
+       Dict[str, Any]: The response body for the action
+   """
+   return {
+       'TEXT': {
+           'body': "The other function {} return function was called successfully".format(function)
+       }
+   }
+
+
+# Function name -> handler, built once at cold start.
+_FUNCTION_HANDLERS: Dict[str, Callable[[str, List[Dict[str, Any]]], Dict[str, Any]]] = {
+   'process_return': _handle_process_return,
+}
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
    """
@@ -30,27 +94,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
        # Execute your business logic here. For more information,
        # refer to: https://docs.aws.amazon.com/bedrock/latest/userguide/agents-lambda.html
-      
-       def process_return(orderNumber):
-           print = "the item was returned successfully"
-
-
-       response_body = {}
-       if function == 'process_return':
-           #extract the OrderNumber from the parameters
-           orderNumber = 'abc123'
-           process_return(orderNumber)
-           response_body = {
-               'TEXT': {
-                   "body": "Process return function was called successfully with parameters:"
-               }
-           }
-       else:   
-           response_body = {
-               'TEXT': {
-                   'body': "The other function {} return function was called successfully".format(function)
-               }
-           }
+
+
+       handler = _FUNCTION_HANDLERS.get(function, _default_handler)
+       response_body = handler(function, parameters)
        action_response = {
            'actionGroup': action_group,
            'function': function,
@@ -64,19 +111,25 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
        }
 
 
-       logger.info('Response: %s', response)
+       # Log only the small identifying fields at INFO; the full response dict
+       # is rendered only when DEBUG logging is enabled.
+       logger.info('Response function=%s group=%s', function, action_group)
+       logger.debug('Response: %s', response)
        return response
 
 
    except KeyError as e:
-       logger.error('Missing required field: %s', str(e))
+       # Take the missing key once and reuse it for both the log and the response.
+       field = e.args[0] if e.args else 'unknown'
+       logger.error('Missing required field: %s', field)
        return {
-           'statusCode': HTTPStatus.BAD_REQUEST,
-           'body': f'Error: {str(e)}'
+           'statusCode': _HTTP_BAD_REQUEST,
+           'body': f'Error: missing field {field}'
        }
    except Exception as e:
-       logger.error('Unexpected error: %s', str(e))
+       # Let logging format the exception lazily instead of calling str() up front.
+       logger.error('Unexpected error: %s', e)
        return {
-           'statusCode': HTTPStatus.INTERNAL_SERVER_ERROR,
+           'statusCode': _HTTP_ISE,
            'body': 'Internal server error'
        }
@@ -4,9 +4,12 @@ Refactored module to invoke an AWS Bedrock Agent with improved efficiency,
 error handling, and readability. Intended for import into other scripts.
 """
 
-import boto3
+from boto3 import client as _boto3_client
+import json
 import textwrap
 import sys
+from functools import lru_cache
+from botocore.config import Config
 from botocore.exceptions import ClientError, BotoCoreError
 
 # --- Configuration ---
@@ -17,173 +20,243 @@ from botocore.exceptions import ClientError, BotoCoreError
 # if the importing script needs flexibility.
 REGION_NAME = 'us-east-1'
 
+# Shared read-only default for nested .get() lookups on trace dicts, so a miss
+# doesn't allocate a fresh empty dict each time. Never mutate this.
+_EMPTY: dict = {}
+
+# Streamed response text is buffered and flushed to stdout once it grows past
+# this many characters (or on a newline), rather than once per chunk.
+_STREAM_FLUSH_BYTES = 512
+
 # --- Boto3 Client Initialization ---
 
-# Initialize the Bedrock Agent Runtime client once when the module is loaded.
-# This client will be reused across multiple calls to invoke_agent.
-try:
-    bedrock_agent_runtime = boto3.client(
-        service_name='bedrock-agent-runtime',
-        region_name=REGION_NAME
-    )
-# Handle potential errors during initial client creation gracefully.
-except (ClientError, BotoCoreError) as e:
-    print(f"ERROR: Failed to initialize Boto3 client for Bedrock Agent Runtime: {e}", file=sys.stderr)
-    # Set client to None or raise an exception to signal failure to the importing script.
-    bedrock_agent_runtime = None
-    # Alternatively: raise ImportError(f"Failed to initialize Boto3 client: {e}") from e
+# Client configuration shared by every call in a warm container.
+# TCP keep-alive and a larger connection pool let repeated InvokeAgent calls
+# reuse the same TLS socket instead of re-establishing it on every turn.
+_BEDROCK_CFG = Config(
+    region_name=REGION_NAME,
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={'mode': 'standard', 'max_attempts': 3},
+    connect_timeout=3,
+    read_timeout=60,
+    user_agent_extra='cip-agent/1.0'
+)
+
+# The Bedrock Agent Runtime client is created lazily on first use and then
+# reused across calls to invoke_agent (and across warm Lambda invocations).
+# Importers that only need the helpers never pay the client setup cost.
+_client = None
+
+def get_client():
+    """Returns the shared Bedrock Agent Runtime client, creating it on first call.
+
+    Returns None if the client could not be initialized; the next call retries.
+    """
+    global _client
+    if _client is None:
+        try:
+            _client = _boto3_client(
+                service_name='bedrock-agent-runtime',
+                config=_BEDROCK_CFG
+            )
+        # Handle potential errors during client creation gracefully.
+        except (ClientError, BotoCoreError) as e:
+            print(f"ERROR: Failed to initialize Boto3 client for Bedrock Agent Runtime: {e}", file=sys.stderr)
+            # Leave the client unset so the caller can report the failure.
+            return None
+    return _client
 
 # --- Helper Functions for Trace Processing ---
 
-def _print_indented(text: str, width: int, indent: str = '  '):
-    """Helper to print text with indentation and wrapping."""
+@lru_cache(maxsize=8)
+def _wrapper(width: int, indent: str) -> textwrap.TextWrapper:
+    """Returns a cached TextWrapper for the given width and indent."""
+    # textwrap.fill builds a new TextWrapper per call; only a few width/indent
+    # combinations are ever used, so build each one once and reuse it.
+    return textwrap.TextWrapper(width=width, initial_indent=indent, subsequent_indent=indent)
+
+def _format_indented(text: str, width: int, indent: str = '  ') -> str:
+    """Helper to format text with indentation and wrapping."""
     # Use textwrap for clean formatting within the specified width.
-    print(textwrap.fill(text, width=width, initial_indent=indent, subsequent_indent=indent))
+    return _wrapper(width, indent).fill(text)
 
-def _process_orchestration_trace(trace_details: dict, width: int):
-    """Processes and prints the orchestration part of the trace for debugging."""
+def _print_indented(text: str, width: int, indent: str = '  '):
+    """Helper to print text with indentation and wrapping."""
+    sys.stdout.write(_format_indented(text, width, indent) + '\n')
+
+# Formatters for the individual invocation input types of an orchestration trace.
+
+def _format_action_group_input(agi: dict, out: list[str]):
+    """Formats an actionGroupInvocationInput into `out`."""
+    out.append(f"  Action Group: {agi.get('actionGroupName', 'N/A')}")
+    out.append(f"  Function: {agi.get('function', 'N/A')}")
+    params = agi.get('parameters', [])
+    out.append("  Parameters:")
+    if params:
+        for param in params:
+            out.append(f"    - Name: {param.get('name', 'N/A')}, Type: {param.get('type', 'N/A')}, Value: {param.get('value', 'N/A')}")
+    else:
+        out.append("    N/A")
+
+def _format_kb_lookup_input(kbl: dict, out: list[str]):
+    """Formats a knowledgeBaseLookupInput into `out`."""
+    out.append(f"  Knowledge Base ID: {kbl.get('knowledgeBaseId', 'N/A')}")
+    out.append(f"  Query Text: {kbl.get('text', 'N/A')}")
+
+def _format_code_interpreter_input(cii: dict, out: list[str]):
+    """Formats a codeInterpreterInput into `out`."""
+    out.append(f"  Code: {cii.get('code', 'N/A')}")
+    out.append(f"  Files: {cii.get('files', 'N/A')}")
+
+# Invocation input key -> formatter. Order matters: the first matching key is used.
+_INVOCATION_INPUT_HANDLERS = {
+    'actionGroupInvocationInput': _format_action_group_input,
+    'knowledgeBaseLookupInput': _format_kb_lookup_input,
+    'codeInterpreterInput': _format_code_interpreter_input,
+}
+
+# Formatters for the individual policy results of a guardrail assessment.
+
+def _format_content_policy(cp: dict, out: list[str]):
+    """Formats Content Policy results into `out`."""
+    out.append("  Content Policy Assessment:")
+    filters = cp.get('filters', [])
+    if filters:
+        for f in filters:
+            out.append(f"    - Filter: {f.get('type', 'N/A')} (Confidence: {f.get('confidence', 'N/A')}, Action: {f.get('action', 'N/A')})")
+    else:
+        out.append("    No content filters applied.")
+
+def _format_sensitive_info_policy(sip: dict, out: list[str]):
+    """Formats Sensitive Information Policy results into `out`."""
+    out.append("  Sensitive Information Policy Assessment:")
+    pii_entities = sip.get('piiEntities', [])
+    if pii_entities:
+        for pii in pii_entities:
+            out.append(f"    - PII Detected: {pii.get('type', 'N/A')} (Action: {pii.get('action', 'N/A')})")
+    else:
+        out.append("    No PII detected.")
+
+def _format_word_policy(wp: dict, out: list[str]):
+    """Formats Word Policy results into `out`."""
+    out.append("  Word Policy Assessment:")
+    # Check for matches in both custom and managed word lists.
+    custom_matches = wp.get('customWords', [])
+    managed_matches = wp.get('managedWordLists', [])
+    if custom_matches or managed_matches:
+        for match in custom_matches:
+            out.append(f"    - Custom Word Match: {match.get('match', 'N/A')} (Action: {match.get('action', 'N/A')})")
+        for match in managed_matches:
+            out.append(f"    - Managed Word List Match: {match.get('match', 'N/A')} (Action: {match.get('action', 'N/A')})")
+    else:
+        out.append("    No word policy matches.")
+
+# Assessment policy key -> formatter, in output order.
+# Placeholder: Add an entry for 'topicPolicy' if Guardrails for Topics is used.
+_ASSESSMENT_HANDLERS = {
+    'contentPolicy': _format_content_policy,
+    'sensitiveInformationPolicy': _format_sensitive_info_policy,
+    'wordPolicy': _format_word_policy,
+}
+
+def _process_orchestration_trace(trace_details: dict, width: int, out: list[str]):
+    """Formats the orchestration part of the trace into `out` for debugging."""
     # Safely access orchestration trace details using .get() to avoid KeyErrors.
-    orch_trace = trace_details.get('orchestrationTrace', {})
+    orch_trace = trace_details.get('orchestrationTrace') or _EMPTY
 
     # Print Rationale/Thought Process if available.
-    rationale = orch_trace.get('rationale', {}).get('text')
+    rationale = (orch_trace.get('rationale') or _EMPTY).get('text')
     if rationale:
-        print("\nAgent's thought process:")
-        _print_indented(rationale, width)
+        out.append("\nAgent's thought process:")
+        out.append(_format_indented(rationale, width))
 
     # Print Invocation Input Details, adapting to different invocation types.
-    inv_input = orch_trace.get('invocationInput', {})
+    inv_input = orch_trace.get('invocationInput') or _EMPTY
     inv_type = inv_input.get('invocationType', 'N/A') # Default to N/A if type is missing.
-    print(f"\nInvocation Input ({inv_type}):")
-
-    # Handle specific invocation types for detailed output.
-    if 'actionGroupInvocationInput' in inv_input:
-        agi = inv_input.get('actionGroupInvocationInput', {})
-        print(f"  Action Group: {agi.get('actionGroupName', 'N/A')}")
-        print(f"  Function: {agi.get('function', 'N/A')}")
-        params = agi.get('parameters', [])
-        print("  Parameters:")
-        if params:
-            for param in params:
-                print(f"    - Name: {param.get('name', 'N/A')}, Type: {param.get('type', 'N/A')}, Value: {param.get('value', 'N/A')}")
-        else:
-            print("    N/A")
-    elif 'knowledgeBaseLookupInput' in inv_input:
-         kbl = inv_input.get('knowledgeBaseLookupInput', {})
-         print(f"  Knowledge Base ID: {kbl.get('knowledgeBaseId', 'N/A')}")
-         print(f"  Query Text: {kbl.get('text', 'N/A')}")
-    elif 'codeInterpreterInput' in inv_input:
-         cii = inv_input.get('codeInterpreterInput', {})
-         print(f"  Code: {cii.get('code', 'N/A')}")
-         print(f"  Files: {cii.get('files', 'N/A')}")
+    out.append(f"\nInvocation Input ({inv_type}):")
+
+    # Handle specific invocation types for detailed output via the handler table;
+    # the first matching key wins, mirroring the previous if/elif order.
+    for key, handler in _INVOCATION_INPUT_HANDLERS.items():
+        if key in inv_input:
+            handler(inv_input[key] or _EMPTY, out)
+            break
     else:
          # Fallback for unknown or other invocation types.
-         print(f"  Details: {inv_input}") # Print raw input if type is not specifically handled.
+         # Dump raw input as compact JSON if type is not specifically handled.
+         out.append("  Details: " + json.dumps(inv_input, separators=(',', ':'), default=str))
 
     # Print Observation Details, adapting to different observation types.
-    obs = orch_trace.get('observation', {})
+    obs = orch_trace.get('observation') or _EMPTY
     obs_type = obs.get('type', 'N/A')
-    print(f"\nObservation ({obs_type}):")
+    out.append(f"\nObservation ({obs_type}):")
 
     # Handle specific observation types.
     if 'actionGroupInvocationOutput' in obs:
-        agio = obs.get('actionGroupInvocationOutput', {})
-        print(f"  Action Group Output: {agio.get('text', 'N/A')}")
+        agio = obs.get('actionGroupInvocationOutput') or _EMPTY
+        out.append(f"  Action Group Output: {agio.get('text', 'N/A')}")
 
     if 'knowledgeBaseLookupOutput' in obs:
-        kblo = obs.get('knowledgeBaseLookupOutput', {})
+        kblo = obs.get('knowledgeBaseLookupOutput') or _EMPTY
         refs = kblo.get('retrievedReferences', [])
-        print("  Knowledge Base Lookup Output:")
+        out.append("  Knowledge Base Lookup Output:")
         if refs:
             for i, ref in enumerate(refs):
-                content = ref.get('content', {}).get('text', 'N/A')
-                location_info = ref.get('location', {})
+                content = (ref.get('content') or _EMPTY).get('text', 'N/A')
+                location_info = ref.get('location') or _EMPTY
                 # Determine location type (S3 or potentially others in future)
                 if 's3Location' in location_info:
-                    location = location_info.get('s3Location', {}).get('uri', 'N/A')
+                    location = (location_info.get('s3Location') or _EMPTY).get('uri', 'N/A')
                 elif 'webLocation' in location_info: # Example for future-proofing
-                    location = location_info.get('webLocation', {}).get('url', 'N/A')
+                    location = (location_info.get('webLocation') or _EMPTY).get('url', 'N/A')
                 else:
                     location = 'N/A'
                 score = ref.get('score', 'N/A') # Retrieve confidence score if available.
-                print(f"    Reference {i+1} (Score: {score}, Location: {location}):")
+                out.append(f"    Reference {i+1} (Score: {score}, Location: {location}):")
                 # Print a snippet of the content for brevity.
-                _print_indented(f"{content[:150]}...", width, indent='      ')
+                out.append(_format_indented(f"{content[:150]}...", width, indent='      '))
         else:
-            print("    No references found.")
+            out.append("    No references found.")
 
     if 'codeInterpreterInvocationOutput' in obs:
-         cio = obs.get('codeInterpreterInvocationOutput', {})
-         print("  Code Interpreter Output:")
+         cio = obs.get('codeInterpreterInvocationOutput') or _EMPTY
+         out.append("  Code Interpreter Output:")
          # Show snippet of execution output.
-         print(f"    Execution Output: {cio.get('executionOutput', 'N/A')[:150]}...")
-         print(f"    Execution Error: {cio.get('executionError', 'N/A')}")
-         print(f"    Execution Timeout: {cio.get('executionTimeout', 'N/A')}")
+         out.append(f"    Execution Output: {cio.get('executionOutput', 'N/A')[:150]}...")
+         out.append(f"    Execution Error: {cio.get('executionError', 'N/A')}")
+         out.append(f"    Execution Timeout: {cio.get('executionTimeout', 'N/A')}")
 
     if 'finalResponse' in obs:
          # Check if final response text exists within the trace observation.
-         final_response = obs.get('finalResponse', {}).get('text', '')
+         final_response = (obs.get('finalResponse') or _EMPTY).get('text', '')
          # Only print if there's actual text, avoids printing empty "Final response" lines.
          if final_response:
-            print(f"\nFinal response (from trace):")
-            _print_indented(final_response, width)
+            out.append(f"\nFinal response (from trace):")
+            out.append(_format_indented(final_response, width))
 
     # Placeholder for other observation types (e.g., RepromptResponse) if needed in the future.
 
-def _process_guardrail_trace(trace_details: dict, width: int):
-    """Processes and prints the guardrail part of the trace for debugging."""
+def _process_guardrail_trace(trace_details: dict, width: int, out: list[str]):
+    """Formats the guardrail part of the trace into `out` for debugging."""
     # Safely access guardrail trace details.
-    guard_trace = trace_details.get('guardrailTrace', {})
+    guard_trace = trace_details.get('guardrailTrace') or _EMPTY
     action = guard_trace.get('action', 'N/A') # Guardrail action (e.g., INTERVENED, NONE).
-    print(f"\nGuardrail Trace (Action: {action}):")
+    out.append(f"\nGuardrail Trace (Action: {action}):")
 
     # Combine input and output assessments for unified processing loop.
     assessments = guard_trace.get('inputAssessments', []) + guard_trace.get('outputAssessments', [])
 
     if not assessments:
-        print("  No guardrail assessments found.")
+        out.append("  No guardrail assessments found.")
         return # Exit early if no assessments to process.
 
     # Iterate through each assessment (could be multiple types per assessment).
+    # Policies are dispatched through the handler table in a fixed order.
     for assessment in assessments:
-        # Process Content Policy results if present.
-        if 'contentPolicy' in assessment:
-            cp = assessment['contentPolicy']
-            print("  Content Policy Assessment:")
-            filters = cp.get('filters', [])
-            if filters:
-                for f in filters:
-                    print(f"    - Filter: {f.get('type', 'N/A')} (Confidence: {f.get('confidence', 'N/A')}, Action: {f.get('action', 'N/A')})")
-            else:
-                print("    No content filters applied.")
-
-        # Process Sensitive Information Policy results if present.
-        if 'sensitiveInformationPolicy' in assessment:
-            sip = assessment['sensitiveInformationPolicy']
-            print("  Sensitive Information Policy Assessment:")
-            pii_entities = sip.get('piiEntities', [])
-            if pii_entities:
-                 for pii in pii_entities:
-                    print(f"    - PII Detected: {pii.get('type', 'N/A')} (Action: {pii.get('action', 'N/A')})")
-            else:
-                print("    No PII detected.")
-
-        # Process Word Policy results if present.
-        if 'wordPolicy' in assessment:
-             wp = assessment['wordPolicy']
-             print("  Word Policy Assessment:")
-             # Check for matches in both custom and managed word lists.
-             custom_matches = wp.get('customWords', [])
-             managed_matches = wp.get('managedWordLists', [])
-             if custom_matches or managed_matches:
-                 for match in custom_matches:
-                     print(f"    - Custom Word Match: {match.get('match', 'N/A')} (Action: {match.get('action', 'N/A')})")
-                 for match in managed_matches:
-                     print(f"    - Managed Word List Match: {match.get('match', 'N/A')} (Action: {match.get('action', 'N/A')})")
-             else:
-                 print("    No word policy matches.")
-
-        # Placeholder: Add processing for 'topicPolicy' if Guardrails for Topics is used.
+        for key, handler in _ASSESSMENT_HANDLERS.items():
+            if key in assessment:
+                handler(assessment[key], out)
 
 # --- Main Agent Invocation Function ---
 
@@ -197,8 +270,8 @@ def invoke_agent(agentId: str,
     """
     Invokes the specified Bedrock Agent and handles the streaming response.
 
-    Requires the 'bedrock_agent_runtime' client to be initialized globally
-    in the module scope. Checks if the client initialization was successful.
+    Obtains the shared Bedrock Agent Runtime client via get_client() and
+    checks if the client initialization was successful.
 
     Args:
         agentId: The unique identifier of the Bedrock Agent.
@@ -225,8 +298,9 @@ def invoke_agent(agentId: str,
         Prints error messages to stderr for AWS API call failures or unexpected errors.
         May implicitly raise exceptions related to Boto3/AWS interaction if not caught.
     """
-    # Check if the global client was initialized successfully.
-    if bedrock_agent_runtime is None:
+    # Check if the shared client was initialized successfully.
+    client = get_client()
+    if client is None:
         error_message = "ERROR: Bedrock Agent Runtime client is not initialized. Cannot invoke agent."
         print(error_message, file=sys.stderr)
         return {
@@ -235,17 +309,29 @@ def invoke_agent(agentId: str,
             'error': error_message
         }
 
+    # Build the separator lines once per call instead of in every print.
+    eq_line = '=' * width
+    dash_line = '-' * width
+
     agent_response = ""
+    # Collect chunks in a list and join once; repeated str += is quadratic.
+    response_chunks: list[str] = []
+    # Reusable buffer for the formatted lines of one trace event.
+    trace_buf: list[str] = []
+    # Pending streamed output, written out on a newline or once it exceeds
+    # _STREAM_FLUSH_BYTES instead of flushing stdout for every chunk.
+    stream_buf: list[str] = []
+    stream_size = 0
     final_session_id = sessionId # Use provided session ID; API doesn't change it here.
     error_message = None
 
     try:
         # --- User Input Display ---
         # Provides clear demarcation in the output log.
-        print(f"\n{'='*width}")
+        print(f"\n{eq_line}")
         print(f"User Input (Session: {sessionId}):")
         _print_indented(inputText, width)
-        print(f"{'-'*width}")
+        print(dash_line)
         print("Agent Output:")
         # Start agent output on the same line for a more natural chat flow if not tracing.
         if not enableTrace:
@@ -253,7 +339,7 @@ def invoke_agent(agentId: str,
 
         # --- API Call ---
         # Invoke the agent via the Boto3 client.
-        response = bedrock_agent_runtime.invoke_agent(
+        response = client.invoke_agent(
             agentId=agentId,
             agentAliasId=agentAliasId,
             sessionId=sessionId,
@@ -264,36 +350,65 @@ def invoke_agent(agentId: str,
 
         # --- Response Stream Processing ---
         event_stream = response.get("completion", [])
-        for event in event_stream:
-            # Handle 'chunk': Contains parts of the agent's response text.
-            if 'chunk' in event:
-                chunk = event['chunk']
-                # Decode bytes safely, replacing errors if any occur.
-                chunk_text = chunk.get('bytes', b'').decode('utf-8', errors='replace')
-                # Aggregate the response text.
-                agent_response += chunk_text
-                # Print chunks immediately only if trace is disabled, for streaming effect.
-                if not enableTrace and chunk_text:
-                    # Replace newlines to prevent messing up indentation when streaming inline.
-                    print(chunk_text.replace("\n", f"\n "), end="", flush=True)
-
-            # Handle 'trace': Contains detailed execution steps (if enableTrace=True).
-            elif 'trace' in event and enableTrace:
-                trace = event.get('trace', {})
-                # Handle potential variations in trace structure across SDK versions.
-                trace_details = trace.get('trace', {})
-                if not trace_details and isinstance(trace, dict) :
-                     trace_details = trace # Adapt if trace details are not nested under 'trace'.
-
-                # Delegate processing to helper functions for modularity.
-                if 'orchestrationTrace' in trace_details:
-                     _process_orchestration_trace(trace_details, width)
-                if 'guardrailTrace' in trace_details:
-                    _process_guardrail_trace(trace_details, width)
-                # Add calls to process other trace types ('postProcessingTrace', etc.) if needed.
-
-            # Note: Session ID doesn't typically change mid-stream or come from response headers
-            # in the InvokeAgent API response body itself for streaming. Sticking to input sessionId.
+        # enableTrace is fixed for the whole call, so pick the loop once up front
+        # instead of re-checking it for every streamed event.
+        if enableTrace:
+            for event in event_stream:
+                # Handle 'chunk': Contains parts of the agent's response text.
+                if 'chunk' in event:
+                    chunk = event['chunk']
+                    # Decode bytes safely, replacing errors if any occur.
+                    # Chunks aren't printed live here; the aggregated response is printed at the end.
+                    response_chunks.append(chunk.get('bytes', b'').decode('utf-8', errors='replace'))
+
+                # Handle 'trace': Contains detailed execution steps.
+                elif 'trace' in event:
+                    trace = event.get('trace') or _EMPTY
+                    # Handle potential variations in trace structure across SDK versions.
+                    trace_details = trace.get('trace') or _EMPTY
+                    if not trace_details and isinstance(trace, dict) :
+                         trace_details = trace # Adapt if trace details are not nested under 'trace'.
+
+                    # Delegate processing to helper functions for modularity.
+                    # Helpers append formatted lines to trace_buf instead of printing.
+                    if 'orchestrationTrace' in trace_details:
+                         _process_orchestration_trace(trace_details, width, trace_buf)
+                    if 'guardrailTrace' in trace_details:
+                        _process_guardrail_trace(trace_details, width, trace_buf)
+                    # Add calls to process other trace types ('postProcessingTrace', etc.) if needed.
+
+                    # Emit the whole trace event with a single write.
+                    if trace_buf:
+                        sys.stdout.write("\n".join(trace_buf) + "\n")
+                        trace_buf.clear()
+        else:
+            # Streaming path: only 'chunk' events matter, any trace events are ignored.
+            # Newlines are re-indented by one space to keep inline streaming aligned.
+            nl_replacement = "\n "
+            for event in event_stream:
+                chunk = event.get('chunk')
+                if chunk:
+                    # Decode bytes safely, replacing errors if any occur.
+                    chunk_text = chunk.get('bytes', b'').decode('utf-8', errors='replace')
+                    # Aggregate the response text.
+                    response_chunks.append(chunk_text)
+                    # Stream chunks out as they arrive, batching small ones.
+                    if chunk_text:
+                        has_newline = "\n" in chunk_text
+                        # Replace newlines to prevent messing up indentation when streaming inline.
+                        # Most token-sized chunks have none, so skip the copy in that case.
+                        if has_newline:
+                            chunk_text = chunk_text.replace("\n", nl_replacement)
+                        stream_buf.append(chunk_text)
+                        stream_size += len(chunk_text)
+                        if has_newline or stream_size > _STREAM_FLUSH_BYTES:
+                            sys.stdout.write("".join(stream_buf))
+                            sys.stdout.flush()
+                            stream_buf.clear()
+                            stream_size = 0
+
+        # Note: Session ID doesn't typically change mid-stream or come from response headers
+        # in the InvokeAgent API response body itself for streaming. Sticking to input sessionId.
 
     # --- Error Handling ---
     except ClientError as e:
@@ -316,21 +431,27 @@ def invoke_agent(agentId: str,
 
     # --- Final Output & Return ---
     finally:
+        # Write out any streamed output still pending (also on error).
+        if stream_buf:
+            sys.stdout.write("".join(stream_buf))
+            sys.stdout.flush()
+        # Build the full response from whatever chunks arrived (even on error).
+        agent_response = "".join(response_chunks)
         # Ensure a newline follows the agent's output, regardless of tracing or streaming.
         print("\n")
         # If tracing was enabled, the chunks weren't printed live.
         # Print the final aggregated response now for completeness, after all trace details.
         if enableTrace and agent_response:
-             print(f"{'-'*width}")
+             print(dash_line)
              print("Aggregated Agent Response:")
              _print_indented(agent_response, width)
 
         # Print a final separator and status summary.
-        print(f"{'='*width}")
+        print(eq_line)
         print(f"Session ID: {final_session_id}")
         status = "Failed" if error_message else "Completed"
         print(f"Status: {status}")
-        print(f"{'='*width}\n")
+        print(f"{eq_line}\n")
 
     # Return the collected data.
     return {